@@ -42,6 +42,23 @@ class Settings:
     DB_NAME: str = "smartmfg_knowledge"
     BM25_PATH: str = os.path.join(DB_PATH, "bm25.pkl")
 
+    # --- 向量检索后端 ---
+    # chroma: 直接查询 Chroma；numpy: 查询进程内 float16/int8 镜像 (Chroma 仍为持久化主存储)
+    VECTOR_BACKEND: str = os.getenv("VECTOR_BACKEND", "chroma").lower()
+    VECTOR_INDEX_PATH: str = os.path.join(DB_PATH, "vector_mirror")
+    VECTOR_INDEX_DTYPE: str = os.getenv("VECTOR_INDEX_DTYPE", "float16")  # float16 | int8
+    VECTOR_INDEX_NLIST: int = int(os.getenv("VECTOR_INDEX_NLIST", 0))     # 0 为精确检索，>0 启用 IVF
+    VECTOR_INDEX_NPROBE: int = int(os.getenv("VECTOR_INDEX_NPROBE", 8))
+
+    # --- BM25 分词 ---
+    # 领域词典 (jieba userdict 格式: 词 词频 词性)，零件号/报警代码由分词器正则整体保留
+    TOKENIZER_USER_DICT: str = os.getenv("TOKENIZER_USER_DICT", str(BASE_DIR / "app" / "utils" / "dicts" / "mfg_dict.txt"))
+    # 并行分词进程数，默认 1 (串行)。fork 出的子进程会继承已加载的 torch/Paddle，多核机器上按需开启
+    TOKENIZER_WORKERS: int = int(os.getenv("TOKENIZER_WORKERS", 1))
+    # 实测串行约 2ms / 500 字切片，200 个切片仅 0.4s，进程池调度开销抵消收益；约 1000 个切片起并行才有意义
+    TOKENIZER_PARALLEL_MIN_DOCS: int = int(os.getenv("TOKENIZER_PARALLEL_MIN_DOCS", 1000))
+    TOKENIZER_CACHE_SIZE: int = 4096         # 查询分词 LRU 缓存条目数
+
     # --- LLM 服务 ---
     # 这里不给默认值，强制要求环境变量提供，否则运行时报错(或者由逻辑处理)
     AI_API_KEY: str = os.getenv("AI_API_KEY", "")
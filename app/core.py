@@ -11,8 +11,11 @@ from langchain_text_splitters import RecursiveCharacterTextSplitter
 from app.config import settings
 from app.utils.ocr import ocr_engine
 from app.utils.bm25 import bm25_retriever
+from app.utils.vector_index import NumpyVectorIndex
 from app.schemas import SourceDocument
 
+SUPPORTED_VECTOR_BACKENDS = ("chroma", "numpy")
+
 class RAGService:
     def __init__(self):
         print("🚀 [Core] 正在初始化 RAG 核心服务...")
@@ -21,6 +24,22 @@ class RAGService:
         self.chroma_client = chromadb.PersistentClient(path=settings.DB_PATH)
         self.collection = self.chroma_client.get_or_create_collection(name=settings.DB_NAME)
         
+        # 1.1 可选的进程内向量镜像 (Chroma 仍为持久化主存储，镜像与其条数不一致时自动重建)
+        if settings.VECTOR_BACKEND not in SUPPORTED_VECTOR_BACKENDS:
+            raise ValueError(f"不支持的向量检索后端: {settings.VECTOR_BACKEND} (可选: {', '.join(SUPPORTED_VECTOR_BACKENDS)})")
+        self.vector_index = None
+        if settings.VECTOR_BACKEND == "numpy":
+            print(f"   Load Vector Mirror: {settings.VECTOR_INDEX_PATH} ({settings.VECTOR_INDEX_DTYPE})")
+            self.vector_index = NumpyVectorIndex(
+                settings.VECTOR_INDEX_PATH,
+                dtype=settings.VECTOR_INDEX_DTYPE,
+                # 距离度量与 Chroma 集合保持一致
+                metric=(self.collection.metadata or {}).get("hnsw:space", "l2"),
+                nlist=settings.VECTOR_INDEX_NLIST,
+                nprobe=settings.VECTOR_INDEX_NPROBE
+            )
+            self.vector_index.sync_from(self.collection)
+        
         # 2. 初始化 Embedder (向量模型)
         print(f"   Load Embedding: {settings.MODEL_PATH}")
         self.embed_model = SentenceTransformer(settings.MODEL_PATH, local_files_only=True)
@@ -78,7 +97,8 @@ class RAGService:
         """
         # 1. 向量检索
         query_vec = self.embed_model.encode([query]).tolist()
-        vec_res = self.collection.query(query_embeddings=query_vec, n_results=settings.DEFAULT_TOP_K)
+        vector_store = self.vector_index if self.vector_index is not None else self.collection
+        vec_res = vector_store.query(query_embeddings=query_vec, n_results=settings.DEFAULT_TOP_K)
         
         # 2. BM25 检索
         bm25_docs, bm25_metas = bm25_retriever.search(query, top_k=settings.DEFAULT_TOP_K)
@@ -200,6 +220,19 @@ class RAGService:
                 ids=ids_to_add
             )
             
+            # 3.1 同步向量镜像；未启用镜像时将其标记失效，切回 numpy 后会从 Chroma 重建，
+            # 否则同 id 原地更新不改变条数，镜像会继续返回旧向量
+            if self.vector_index is not None:
+                try:
+                    self.vector_index.upsert(ids_to_add, embeddings, docs_to_add, metas_to_add)
+                except Exception as e:
+                    # Chroma 已写入成功，镜像内容不再可信：先标记失效 (重建失败时重启也会重建)，再从 Chroma 重建
+                    print(f"⚠️ [Core] 向量镜像更新失败，正在从 Chroma 重建: {e}")
+                    NumpyVectorIndex.invalidate(settings.VECTOR_INDEX_PATH)
+                    self.vector_index.rebuild(self.collection)
+            else:
+                NumpyVectorIndex.invalidate(settings.VECTOR_INDEX_PATH)
+            
             # 4. 存入 BM25
             bm25_retriever.add_documents(docs_to_add, metas_to_add)
             
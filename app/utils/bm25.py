@@ -1,14 +1,15 @@
 # app/utils/bm25.py
 import os
 import pickle
-import jieba
 from rank_bm25 import BM25Okapi
 from typing import List, Tuple
 from app.config import settings
+from app.utils.tokenizer import chinese_tokenizer
 
 class BM25Retriever:
     def __init__(self):
         self.persist_path = settings.BM25_PATH
+        self.tokenizer = chinese_tokenizer
         self.bm25 = None
         self.documents = []
         self.metadatas = []
@@ -24,6 +25,13 @@ class BM25Retriever:
                     self.documents = data["documents"]
                     self.metadatas = data["metadatas"]
                     self.tokenized_corpus = data["tokenized_corpus"]
+                    index_version = data.get("tokenizer_version")
+                # 分词规则或领域词典变化后，旧索引的切分与查询不一致，需重新分词
+                if index_version != self.tokenizer.version:
+                    print(f"🔨 [BM25] 分词器版本变化 ({index_version} -> {self.tokenizer.version})，正在重新分词...")
+                    self.tokenized_corpus = self.tokenizer.tokenize_batch(self.documents)
+                    self.save_index()
+                if self.tokenized_corpus:
                     self.bm25 = BM25Okapi(self.tokenized_corpus)
                 print(f"✅ [BM25] 索引已加载，包含 {len(self.documents)} 条文档")
             except Exception as e:
@@ -33,7 +41,8 @@ class BM25Retriever:
         data = {
             "documents": self.documents,
             "metadatas": self.metadatas,
-            "tokenized_corpus": self.tokenized_corpus
+            "tokenized_corpus": self.tokenized_corpus,
+            "tokenizer_version": self.tokenizer.version
         }
         # 确保目录存在
         os.makedirs(os.path.dirname(self.persist_path), exist_ok=True)
@@ -44,7 +53,7 @@ class BM25Retriever:
         if not docs: return
         
         print(f"🔨 [BM25] 正在增量更新索引 ({len(docs)} docs)...")
-        new_tokenized = [list(jieba.cut_for_search(doc)) for doc in docs]
+        new_tokenized = self.tokenizer.tokenize_batch(docs)
         
         self.documents.extend(docs)
         self.metadatas.extend(metas)
@@ -58,7 +67,7 @@ class BM25Retriever:
         if not self.bm25:
             return [], []
             
-        tokenized_query = list(jieba.cut_for_search(query))
+        tokenized_query = self.tokenizer.tokenize_query(query)
         docs = self.bm25.get_top_n(tokenized_query, self.documents, n=top_k)
         
         # 找回 metadata (简化版逻辑)
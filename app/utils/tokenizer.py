@@ -0,0 +1,158 @@
+# app/utils/tokenizer.py
+import os
+import re
+import hashlib
+import logging
+import multiprocessing
+from functools import lru_cache
+from concurrent.futures import ProcessPoolExecutor
+from typing import List, Optional
+import jieba
+from app.config import settings
+
+# 分词规则版本号：修改切分/过滤逻辑时必须递增，BM25 索引据此判断是否需要重新分词
+# (未记录版本的旧索引视为直接使用 jieba.cut_for_search 构建)
+TOKENIZER_VERSION = "2"
+
+# 零件号 / 报警代码 (如 E-1023、6ES7-315-2AG10、ALM.1001)，jieba 会在 "-" "." 处切碎
+# 必须同时含字母和数字，小数、日期、时间 (3.5、2024-01-15、10:30) 仍交给 jieba
+_CODE_PATTERN = re.compile(r"[A-Za-z0-9]+(?:[-_./:][A-Za-z0-9]+)+")
+# "." 两侧都是数字时是小数点 (3.5mm、X10.5、M8x1.25)，不作为分隔符
+_CODE_SEPARATORS = re.compile(r"[-_/:]|(?<=[A-Za-z])\.|\.(?=[A-Za-z])")
+_DECIMAL_PATTERN = re.compile(r"\d\.\d")
+# 纯空白 / 纯标点的 token 对检索没有意义，只会撑大倒排表
+_NOISE_PATTERN = re.compile(r"^[\W_]+$")
+
+
+class ChineseTokenizer:
+    """
+    BM25 专用分词器：索引与查询共用同一套规则，保证切分结果一致
+    - 启动时立即加载词典 (避免首个查询承担 jieba 懒加载的耗时)
+    - 支持领域词典 (jieba userdict 格式)
+    - 批量入库可选多进程并行分词 (fork 常驻进程池，复用已加载的词典)，查询分词走 LRU 缓存
+    """
+
+    def __init__(self, user_dict_path: Optional[str] = None, cache_size: int = 4096,
+                 workers: int = 1, parallel_min_docs: int = 1000):
+        self.user_dict_path = user_dict_path
+        self.workers = max(1, workers)
+        self.parallel_min_docs = parallel_min_docs
+        # 独立的 jieba 实例，不污染全局默认词典
+        self._jieba = jieba.Tokenizer()
+        self.version = self._compute_version()
+        self._cached_query = lru_cache(maxsize=cache_size)(self._tokenize_tuple)
+        self._pool = None
+
+        self.initialize()
+
+    def initialize(self):
+        """立即加载主词典和领域词典"""
+        jieba.setLogLevel(logging.WARNING)
+        self._jieba.initialize()
+        if self.user_dict_path and os.path.exists(self.user_dict_path):
+            self._jieba.load_userdict(self.user_dict_path)
+            print(f"📖 [Tokenizer] 已加载领域词典: {self.user_dict_path}")
+        elif self.user_dict_path:
+            print(f"⚠️ [Tokenizer] 领域词典不存在，跳过: {self.user_dict_path}")
+
+    def _compute_version(self) -> str:
+        """规则版本 + 领域词典内容摘要，任一变化都会导致索引重建"""
+        digest = "none"
+        if self.user_dict_path and os.path.exists(self.user_dict_path):
+            with open(self.user_dict_path, "rb") as f:
+                digest = hashlib.sha1(f.read()).hexdigest()[:12]
+        return f"{TOKENIZER_VERSION}:{digest}"
+
+    def tokenize(self, text: str) -> List[str]:
+        tokens = []
+        last = 0
+        for match in _CODE_PATTERN.finditer(text):
+            code = match.group()
+            if not (any(c.isalpha() for c in code) and any(c.isdigit() for c in code)):
+                continue
+            # 只有小数点、没有真正分隔符的 (3.5mm、X10.5) 交给 jieba
+            if not _CODE_SEPARATORS.search(code):
+                continue
+            tokens.extend(self._cut(text[last:match.start()]))
+            tokens.extend(self._code_tokens(code))
+            last = match.end()
+        tokens.extend(self._cut(text[last:]))
+        return tokens
+
+    def _code_tokens(self, code: str) -> List[str]:
+        """
+        与 cut_for_search 的思路一致：先给出各段，再给出完整代码
+        E-1023 -> [e, 1023, e1023, e-1023]，查询 "1023" / "E1023" / "E-1023" 都能命中
+        含小数的段交给 jieba，且不拼接 (Y-3.2 不能产生 y32)
+        """
+        code = code.lower()
+        parts = [p for p in _CODE_SEPARATORS.split(code) if p]
+        tokens = []
+        for part in parts:
+            tokens.extend(self._cut(part) if _DECIMAL_PATTERN.search(part) else [part])
+        if not _DECIMAL_PATTERN.search(code):
+            tokens.append("".join(parts))
+        tokens.append(code)
+        return tokens
+
+    def _cut(self, text: str) -> List[str]:
+        if not text:
+            return []
+        return [
+            w.lower() for w in self._jieba.cut_for_search(text)
+            if w.strip() and not _NOISE_PATTERN.match(w)
+        ]
+
+    def _tokenize_tuple(self, text: str) -> tuple:
+        return tuple(self.tokenize(text))
+
+    def tokenize_query(self, query: str) -> List[str]:
+        """查询分词 (带 LRU 缓存)"""
+        return list(self._cached_query(query))
+
+    def tokenize_batch(self, texts: List[str]) -> List[List[str]]:
+        """批量分词：开启多进程且文档数量达到阈值时并行，否则串行"""
+        if self.workers > 1 and len(texts) >= self.parallel_min_docs:
+            pool = self._get_pool()
+            if pool is not None:
+                try:
+                    chunksize = max(1, len(texts) // (self.workers * 4))
+                    return list(pool.map(_tokenize_in_worker, texts, chunksize=chunksize))
+                except Exception as e:
+                    print(f"⚠️ [Tokenizer] 并行分词失败，回退串行: {e}")
+                    # 释放已损坏的进程池及其管理线程，下次使用时重建
+                    pool.shutdown(wait=False, cancel_futures=True)
+                    self._pool = None
+        return [self.tokenize(text) for text in texts]
+
+    def _get_pool(self) -> Optional[ProcessPoolExecutor]:
+        """
+        常驻进程池，首次使用时创建
+        只用 fork：子进程直接继承已加载词典的分词器，不会重复加载；不支持 fork 的平台回退串行
+        """
+        if self._pool is None:
+            if "fork" not in multiprocessing.get_all_start_methods():
+                return None
+            global _worker_tokenizer
+            _worker_tokenizer = self
+            self._pool = ProcessPoolExecutor(
+                max_workers=self.workers,
+                mp_context=multiprocessing.get_context("fork")
+            )
+        return self._pool
+
+
+# --- 子进程分词 (fork 时继承父进程设置的分词器) ---
+_worker_tokenizer = None
+
+def _tokenize_in_worker(text: str) -> List[str]:
+    return _worker_tokenizer.tokenize(text)
+
+
+# 单例导出 (导入即完成词典加载)
+chinese_tokenizer = ChineseTokenizer(
+    user_dict_path=settings.TOKENIZER_USER_DICT,
+    cache_size=settings.TOKENIZER_CACHE_SIZE,
+    workers=settings.TOKENIZER_WORKERS,
+    parallel_min_docs=settings.TOKENIZER_PARALLEL_MIN_DOCS
+)
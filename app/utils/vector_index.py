@@ -0,0 +1,465 @@
+# app/utils/vector_index.py
+import os
+import pickle
+import numpy as np
+from typing import List
+
+class NumpyVectorIndex:
+    """
+    Chroma 集合的进程内镜像：量化向量矩阵 (float16 / int8，memmap) + id 数组，NumPy 批量检索
+    - Chroma 仍是持久化的唯一事实来源，镜像缺失、配置变化或条数不一致时从 Chroma 重建
+    - nlist=0 为精确检索；nlist>0 时启用 IVF (k-means 粗聚类 + nprobe 探查)
+    - query() 的入参和返回结构与 collection.query 保持一致，可直接替换
+    - 写入只追加：向量写入可增长的 memmap 文件，文本/元数据追加到日志，单次上传的 I/O 与语料规模无关
+    - 检索使用常驻内存的 float32 副本 (加载时反量化一次，upsert 时增量更新)，
+      量化矩阵只负责持久化；每次查询再反量化整个矩阵的开销会超过检索本身
+    - 只支持单个写入进程 (与 Dockerfile 中的单 worker uvicorn 一致)
+    """
+    SUPPORTED_DTYPES = ("float16", "int8")
+    SUPPORTED_METRICS = ("l2", "cosine", "ip")
+
+    MATRIX_FILE = "vectors.bin"
+    LOG_FILE = "vectors_log.pkl"
+    META_FILE = "vectors_meta.pkl"
+
+    MIN_CAPACITY = 1024
+    IVF_MIN_POINTS_PER_LIST = 10   # 每个聚类平均不足该数量时聚类没有意义，继续走精确检索
+    IVF_RETRAIN_GROWTH = 2.0       # 语料规模相比上次训练增长到该倍数时重新训练聚类中心
+
+    def __init__(self, persist_dir: str, dtype: str = "float16", metric: str = "l2",
+                 nlist: int = 0, nprobe: int = 8, block_size: int = 65536):
+        if dtype not in self.SUPPORTED_DTYPES:
+            raise ValueError(f"不支持的向量量化类型: {dtype}")
+        if metric not in self.SUPPORTED_METRICS:
+            raise ValueError(f"不支持的距离度量: {metric}")
+
+        self.persist_dir = persist_dir
+        self.matrix_path = os.path.join(persist_dir, self.MATRIX_FILE)
+        self.log_path = os.path.join(persist_dir, self.LOG_FILE)
+        self.meta_path = os.path.join(persist_dir, self.META_FILE)
+        self.dtype = dtype
+        self.metric = metric
+        self.nlist = max(0, nlist)
+        self.nprobe = nprobe
+        self.block_size = block_size
+
+        self._reset()
+        self.load_index()
+
+    def _reset(self):
+        self.matrix = None          # (capacity, d) memmap，前 len(ids) 行有效
+        self._vectors = None        # 常驻 float32 副本，前 len(ids) 行有效，检索只读这里
+        self.dim = None
+        self.capacity = 0
+        self.scales = None          # int8 时每行的反量化系数
+        self.sq_norms = None        # 原始向量的平方范数 (l2 距离用)
+        self.ids = []
+        self.documents = []
+        self.metadatas = []
+        self.centroids = None       # IVF 聚类中心
+        self.assignments = None     # 每行所属的聚类
+        self.ivf_trained_size = 0   # 上次训练聚类时的向量数
+        self._inverted_lists = []
+        self._id_pos = {}
+        self._log_records = 0
+        self._log_rows = 0
+
+    def __len__(self):
+        return len(self.ids)
+
+    @classmethod
+    def invalidate(cls, persist_dir: str):
+        """Chroma 被绕过镜像修改时调用：删除元数据，下次加载时从 Chroma 重建"""
+        meta_path = os.path.join(persist_dir, cls.META_FILE)
+        if os.path.exists(meta_path):
+            os.remove(meta_path)
+
+    # --- 持久化 ---
+
+    def load_index(self):
+        if not os.path.exists(self.meta_path):
+            return
+        try:
+            with open(self.meta_path, "rb") as f:
+                meta = pickle.load(f)
+            if (meta["dtype"], meta["metric"], meta["nlist"]) != (self.dtype, self.metric, self.nlist):
+                print("⚠️ [VectorIndex] 量化类型/距离度量/IVF 配置已变化，等待从 Chroma 重建")
+                return
+
+            count = meta["count"]
+            self.dim = meta["dim"]
+            self.capacity = meta["capacity"]
+            self.matrix = np.memmap(self.matrix_path, dtype=self.dtype, mode="r+",
+                                    shape=(self.capacity, self.dim))
+            self.centroids = meta["centroids"]
+            self.ivf_trained_size = meta["ivf_trained_size"]
+
+            self.ids = [None] * count
+            self.documents = [None] * count
+            self.metadatas = [None] * count
+            self.sq_norms = np.zeros(count, dtype=np.float32)
+            self.scales = np.zeros(count, dtype=np.float32) if self.dtype == "int8" else None
+            self.assignments = np.zeros(count, dtype=np.int32) if self.centroids is not None else None
+
+            # 只重放元数据中登记过的日志记录，写入中途崩溃留下的尾部记录会被忽略
+            with open(self.log_path, "rb") as f:
+                for _ in range(meta["log_records"]):
+                    self._apply_record(pickle.load(f))
+            self._log_records = meta["log_records"]
+
+            self._vectors = np.empty((count, self.dim), dtype=np.float32)
+            for start in range(0, count, self.block_size):
+                stop = min(count, start + self.block_size)
+                self._vectors[start:stop] = self._dequantize(slice(start, stop))
+
+            self._id_pos = {id_: i for i, id_ in enumerate(self.ids)}
+            self._build_inverted_lists()
+            print(f"✅ [VectorIndex] 向量镜像已加载，包含 {len(self.ids)} 条向量 ({self.dtype})")
+        except Exception as e:
+            print(f"⚠️ [VectorIndex] 向量镜像加载失败，等待从 Chroma 重建: {e}")
+            self._reset()
+
+    def _apply_record(self, record: dict):
+        pos = record["pos"]
+        for p, id_, doc, meta in zip(pos, record["ids"], record["documents"], record["metadatas"]):
+            self.ids[p] = id_
+            self.documents[p] = doc
+            self.metadatas[p] = meta
+        self.sq_norms[pos] = record["sq_norms"]
+        if self.scales is not None:
+            self.scales[pos] = record["scales"]
+        if self.assignments is not None:
+            self.assignments[pos] = record["assignments"]
+        self._log_rows += len(pos)
+
+    def _make_record(self, pos: np.ndarray) -> dict:
+        return {
+            "pos": pos,
+            "ids": [self.ids[p] for p in pos],
+            "documents": [self.documents[p] for p in pos],
+            "metadatas": [self.metadatas[p] for p in pos],
+            "sq_norms": self.sq_norms[pos],
+            "scales": self.scales[pos] if self.scales is not None else None,
+            "assignments": self.assignments[pos] if self.assignments is not None else None
+        }
+
+    def _append_log(self, pos: np.ndarray):
+        with open(self.log_path, "ab") as f:
+            pickle.dump(self._make_record(pos), f)
+        self._log_records += 1
+        self._log_rows += len(pos)
+
+    def _compact_log(self):
+        """用一条包含全部行的记录重写日志 (重新训练聚类或覆盖写过多时)"""
+        tmp_log = self.log_path + ".tmp"
+        with open(tmp_log, "wb") as f:
+            pickle.dump(self._make_record(np.arange(len(self.ids))), f)
+        os.replace(tmp_log, self.log_path)
+        self._log_records = 1
+        self._log_rows = len(self.ids)
+
+    def _write_meta(self):
+        meta = {
+            "dtype": self.dtype,
+            "metric": self.metric,
+            "nlist": self.nlist,
+            "dim": self.dim,
+            "capacity": self.capacity,
+            "count": len(self.ids),
+            "log_records": self._log_records,
+            "centroids": self.centroids,
+            "ivf_trained_size": self.ivf_trained_size
+        }
+        tmp_meta = self.meta_path + ".tmp"
+        with open(tmp_meta, "wb") as f:
+            pickle.dump(meta, f)
+        os.replace(tmp_meta, self.meta_path)
+
+    def _ensure_capacity(self, n: int):
+        """容量不足时按倍数扩容，均摊后每行只拷贝常数次"""
+        if n <= self.capacity:
+            return
+        new_capacity = max(self.MIN_CAPACITY, self.capacity * 2, n)
+        os.makedirs(self.persist_dir, exist_ok=True)
+        tmp_matrix = self.matrix_path + ".tmp"
+        grown = np.memmap(tmp_matrix, dtype=self.dtype, mode="w+", shape=(new_capacity, self.dim))
+        filled = min(len(self.ids), self.capacity)
+        for start in range(0, filled, self.block_size):
+            stop = min(filled, start + self.block_size)
+            grown[start:stop] = self.matrix[start:stop]
+        grown.flush()
+        del grown
+        os.replace(tmp_matrix, self.matrix_path)
+        self.matrix = np.memmap(self.matrix_path, dtype=self.dtype, mode="r+",
+                                shape=(new_capacity, self.dim))
+        self.capacity = new_capacity
+
+    def _clear_files(self):
+        for path in (self.meta_path, self.log_path, self.matrix_path):
+            if os.path.exists(path):
+                os.remove(path)
+
+    # --- 写入 ---
+
+    def sync_from(self, collection, page_size: int = 5000):
+        """条数与 Chroma 不一致 (或镜像已失效) 时，从 Chroma 全量重建镜像"""
+        total = collection.count()
+        if total == len(self.ids):
+            return
+
+        print(f"🔨 [VectorIndex] 镜像与 Chroma 不一致 ({len(self.ids)} vs {total})，正在重建...")
+        self.rebuild(collection, page_size)
+
+    def rebuild(self, collection, page_size: int = 5000):
+        """丢弃当前镜像，从 Chroma 全量重建"""
+        total = collection.count()
+        ids, embeddings, documents, metadatas = [], [], [], []
+        for offset in range(0, total, page_size):
+            page = collection.get(
+                include=["embeddings", "documents", "metadatas"],
+                limit=page_size,
+                offset=offset
+            )
+            ids.extend(page["ids"])
+            embeddings.extend(page["embeddings"])
+            documents.extend(page["documents"])
+            metadatas.extend(page["metadatas"])
+
+        self._reset()
+        self._clear_files()
+        self.upsert(ids, embeddings, documents, metadatas)
+
+    def upsert(self, ids: List[str], embeddings, documents: List[str], metadatas: List[dict]):
+        if not ids: return
+
+        vecs = np.asarray(embeddings, dtype=np.float32)
+        if self.metric == "cosine":
+            vecs = vecs / np.maximum(np.linalg.norm(vecs, axis=1, keepdims=True), 1e-12)
+        codes, scales = self._quantize(vecs)
+        sq_norms = np.einsum("ij,ij->i", vecs, vecs)
+        if self.dim is None:
+            self.dim = vecs.shape[1]
+
+        # 已存在的 id 原地覆盖，新 id 追加到末尾
+        old_count = len(self.ids)
+        pos = np.empty(len(ids), dtype=np.int64)
+        for i, id_ in enumerate(ids):
+            p = self._id_pos.get(id_)
+            if p is None:
+                p = len(self.ids)
+                self._id_pos[id_] = p
+                self.ids.append(id_)
+                self.documents.append(documents[i])
+                self.metadatas.append(metadatas[i])
+            else:
+                self.documents[p] = documents[i]
+                self.metadatas[p] = metadatas[i]
+            pos[i] = p
+
+        n = len(self.ids)
+        # 原地覆盖会先改动磁盘上的向量：写完日志和元数据前崩溃，旧文本会对上新向量且条数不变。
+        # 先删除元数据，崩溃后重启即从 Chroma 重建，_write_meta 成功后恢复
+        if (pos < old_count).any():
+            self.invalidate(self.persist_dir)
+        self._ensure_capacity(n)
+        self.matrix[pos] = codes
+        self.matrix.flush()
+        self.sq_norms = _grow(self.sq_norms, n, np.float32)
+        self.sq_norms[pos] = sq_norms
+        if scales is not None:
+            self.scales = _grow(self.scales, n, np.float32)
+            self.scales[pos] = scales
+        # 常驻副本取反量化后的值，与重启后从磁盘加载的结果一致
+        self._vectors = _grow_rows(self._vectors, n, self.dim)
+        self._vectors[pos] = self._dequantize(pos)
+
+        retrained = self._update_ivf(pos)
+        # 重新训练后所有行的聚类都变了；覆盖写累积过多时也压缩日志
+        if retrained or self._log_rows + len(pos) > 2 * n:
+            self._compact_log()
+        else:
+            self._append_log(pos)
+        self._write_meta()
+        print(f"🔨 [VectorIndex] 镜像已更新，共 {n} 条向量")
+
+    def _quantize(self, vecs: np.ndarray):
+        if self.dtype == "float16":
+            return vecs.astype(np.float16), None
+        # 对称逐行量化: x ≈ code * scale
+        scales = np.abs(vecs).max(axis=1) / 127.0
+        scales = np.maximum(scales, 1e-12).astype(np.float32)
+        codes = np.clip(np.rint(vecs / scales[:, None]), -127, 127).astype(np.int8)
+        return codes, scales
+
+    def _dequantize(self, rows) -> np.ndarray:
+        block = np.asarray(self.matrix[rows], dtype=np.float32)
+        if self.dtype == "int8":
+            block *= self.scales[rows][:, None]
+        return block
+
+    # --- IVF ---
+
+    def _update_ivf(self, pos: np.ndarray) -> bool:
+        """维护聚类；返回是否重新训练了聚类中心"""
+        n = len(self.ids)
+        if self.nlist <= 0 or n < self.nlist * self.IVF_MIN_POINTS_PER_LIST:
+            self.centroids, self.assignments, self.ivf_trained_size = None, None, 0
+            self._inverted_lists = []
+            return False
+
+        if self.centroids is None or n >= self.ivf_trained_size * self.IVF_RETRAIN_GROWTH:
+            self._train_ivf()
+            self._build_inverted_lists()
+            return True
+
+        self.assignments = _grow(self.assignments, n, np.int32)
+        self.assignments[pos] = _nearest_centroid(self._vectors[pos], self.centroids)
+        self._build_inverted_lists()
+        return False
+
+    def _train_ivf(self, n_iter: int = 10):
+        rng = np.random.default_rng(0)
+        n = len(self.ids)
+        sample = np.sort(rng.choice(n, min(n, self.nlist * 256), replace=False))
+        X = self._vectors[sample]
+        centroids = X[rng.choice(len(X), self.nlist, replace=False)].copy()
+        for _ in range(n_iter):
+            assign = _nearest_centroid(X, centroids)
+            for c in range(self.nlist):
+                members = X[assign == c]
+                if len(members):
+                    centroids[c] = members.mean(axis=0)
+        self.centroids = centroids
+        self.ivf_trained_size = n
+
+        self.assignments = np.empty(n, dtype=np.int32)
+        for start in range(0, n, self.block_size):
+            stop = min(n, start + self.block_size)
+            self.assignments[start:stop] = _nearest_centroid(self._vectors[start:stop], centroids)
+
+    def _build_inverted_lists(self):
+        if self.assignments is None:
+            self._inverted_lists = []
+            return
+        order = np.argsort(self.assignments, kind="stable")
+        counts = np.bincount(self.assignments, minlength=len(self.centroids))
+        self._inverted_lists = np.split(order, np.cumsum(counts)[:-1])
+
+    # --- 检索 ---
+
+    def query(self, query_embeddings, n_results: int = 10) -> dict:
+        """与 collection.query 相同的返回结构: {'ids': [[...]], 'documents': [[...]], ...}"""
+        Q = np.asarray(query_embeddings, dtype=np.float32)
+        if Q.ndim == 1:
+            Q = Q[None, :]
+        if self.metric == "cosine":
+            Q = Q / np.maximum(np.linalg.norm(Q, axis=1, keepdims=True), 1e-12)
+
+        result = {"ids": [], "documents": [], "metadatas": [], "distances": []}
+        if not self.ids:
+            for key in result:
+                result[key] = [[] for _ in range(len(Q))]
+            return result
+
+        k = min(n_results, len(self.ids))
+        if self.centroids is not None:
+            positions, distances = self._ivf_search(Q, k)
+        else:
+            positions, distances = self._exact_search(Q, k)
+
+        for pos_row, dist_row in zip(positions, distances):
+            # IVF 探查到的候选不足 k 个时，补位的是 inf
+            keep = np.isfinite(dist_row)
+            pos_row, dist_row = pos_row[keep], dist_row[keep]
+            result["ids"].append([self.ids[p] for p in pos_row])
+            result["documents"].append([self.documents[p] for p in pos_row])
+            result["metadatas"].append([self.metadatas[p] for p in pos_row])
+            result["distances"].append([float(d) for d in dist_row])
+        return result
+
+    def _distances(self, Q: np.ndarray, rows) -> np.ndarray:
+        """距离定义与 Chroma (hnsw:space) 一致"""
+        dots = Q @ self._vectors[rows].T
+        if self.metric == "l2":
+            q_norms = np.einsum("ij,ij->i", Q, Q)
+            return self.sq_norms[rows][None, :] - 2 * dots + q_norms[:, None]
+        return 1.0 - dots
+
+    def _exact_search(self, Q: np.ndarray, k: int):
+        n = len(self.ids)
+        best_d = np.empty((len(Q), 0), dtype=np.float32)
+        best_i = np.empty((len(Q), 0), dtype=np.int64)
+        # 分块计算，控制反量化后的内存占用
+        for start in range(0, n, self.block_size):
+            stop = min(n, start + self.block_size)
+            d = self._distances(Q, slice(start, stop))
+            idx = np.broadcast_to(np.arange(start, stop), d.shape)
+            best_d, best_i = _merge_topk(best_d, best_i, d, idx, k)
+        return _sort_topk(best_d, best_i)
+
+    def _centroid_distances(self, Q: np.ndarray) -> np.ndarray:
+        """
+        选择探查簇的排序依据，与最终距离同向：
+        l2 用到中心的欧氏距离；ip / cosine 的距离是 1 - q·x，按 q·c (簇内 q·x 的均值) 从大到小
+        """
+        if self.metric == "l2":
+            return _pairwise_sq_l2(Q, self.centroids)
+        return -(Q @ self.centroids.T)
+
+    def _ivf_search(self, Q: np.ndarray, k: int):
+        """整批查询一起计算：取所有查询探查簇的并集，再按查询屏蔽未探查的簇"""
+        probe = min(self.nprobe, len(self.centroids))
+        probes = np.argsort(self._centroid_distances(Q), axis=1)[:, :probe]
+        probe_mask = np.zeros((len(Q), len(self.centroids)), dtype=bool)
+        np.put_along_axis(probe_mask, probes, True, axis=1)
+
+        rows = np.sort(np.concatenate([self._inverted_lists[c] for c in np.unique(probes)]))
+        best_d = np.empty((len(Q), 0), dtype=np.float32)
+        best_i = np.empty((len(Q), 0), dtype=np.int64)
+        for start in range(0, len(rows), self.block_size):
+            block = rows[start:start + self.block_size]
+            d = self._distances(Q, block)
+            d = np.where(probe_mask[:, self.assignments[block]], d, np.inf)
+            best_d, best_i = _merge_topk(best_d, best_i, d, np.broadcast_to(block, d.shape), k)
+        return _sort_topk(best_d, best_i)
+
+
+def _grow(arr, n: int, dtype) -> np.ndarray:
+    """把一维数组扩展到长度 n (新位置填 0)"""
+    if arr is None:
+        return np.zeros(n, dtype=dtype)
+    if len(arr) >= n:
+        return arr
+    return np.concatenate([arr, np.zeros(n - len(arr), dtype=dtype)])
+
+def _grow_rows(arr, n: int, dim: int) -> np.ndarray:
+    """二维 float32 数组按倍数扩容到至少 n 行 (多出的行不参与检索)"""
+    if arr is None:
+        return np.zeros((n, dim), dtype=np.float32)
+    if len(arr) >= n:
+        return arr
+    grown = np.zeros((max(n, 2 * len(arr)), dim), dtype=np.float32)
+    grown[:len(arr)] = arr
+    return grown
+
+def _pairwise_sq_l2(X: np.ndarray, C: np.ndarray) -> np.ndarray:
+    return (
+        np.einsum("ij,ij->i", X, X)[:, None]
+        - 2 * X @ C.T
+        + np.einsum("ij,ij->i", C, C)[None, :]
+    )
+
+def _nearest_centroid(X: np.ndarray, C: np.ndarray) -> np.ndarray:
+    return np.argmin(_pairwise_sq_l2(X, C), axis=1)
+
+def _merge_topk(best_d, best_i, d, idx, k):
+    all_d = np.concatenate([best_d, d], axis=1)
+    all_i = np.concatenate([best_i, idx], axis=1)
+    if all_d.shape[1] <= k:
+        return all_d, all_i
+    part = np.argpartition(all_d, k - 1, axis=1)[:, :k]
+    return np.take_along_axis(all_d, part, axis=1), np.take_along_axis(all_i, part, axis=1)
+
+def _sort_topk(best_d, best_i):
+    order = np.argsort(best_d, axis=1)
+    return np.take_along_axis(best_i, order, axis=1), np.take_along_axis(best_d, order, axis=1)
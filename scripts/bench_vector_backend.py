@@ -0,0 +1,108 @@
+# scripts/bench_vector_backend.py
+# 对比 Chroma 与 NumPy 向量镜像的召回率和查询延迟
+# 用法:
+#   python -m scripts.bench_vector_backend                       # 使用 DB_PATH 下的现有知识库
+#   python -m scripts.bench_vector_backend --synthetic 20000     # 使用随机向量 (内存 Chroma)
+import argparse
+import tempfile
+import time
+import chromadb
+import numpy as np
+
+from app.config import settings
+from app.utils.vector_index import NumpyVectorIndex
+
+
+def load_collection(args):
+    if args.synthetic:
+        rng = np.random.default_rng(0)
+        vecs = rng.standard_normal((args.synthetic, args.dim)).astype(np.float32)
+        vecs /= np.linalg.norm(vecs, axis=1, keepdims=True)
+        client = chromadb.Client()
+        collection = client.get_or_create_collection(name="bench_vectors")
+        ids = [f"doc_{i}" for i in range(len(vecs))]
+        for start in range(0, len(vecs), 5000):
+            collection.add(
+                ids=ids[start:start + 5000],
+                embeddings=vecs[start:start + 5000].tolist(),
+                documents=ids[start:start + 5000],
+                metadatas=[{"source": "synthetic", "page": 0}] * len(ids[start:start + 5000])
+            )
+        return collection
+    client = chromadb.PersistentClient(path=settings.DB_PATH)
+    return client.get_collection(name=settings.DB_NAME)
+
+
+def exact_ground_truth(ids, vecs, queries, metric, k):
+    if metric == "cosine":
+        vecs = vecs / np.linalg.norm(vecs, axis=1, keepdims=True)
+        queries = queries / np.linalg.norm(queries, axis=1, keepdims=True)
+    if metric == "l2":
+        dist = (queries ** 2).sum(1)[:, None] - 2 * queries @ vecs.T + (vecs ** 2).sum(1)[None, :]
+    else:
+        dist = 1.0 - queries @ vecs.T
+    top = np.argsort(dist, axis=1)[:, :k]
+    return [set(ids[i] for i in row) for row in top]
+
+
+def run(name, store, queries, truth, k):
+    latencies, hits = [], 0
+    for q, gt in zip(queries, truth):
+        start = time.perf_counter()
+        res = store.query(query_embeddings=[q.tolist()], n_results=k)
+        latencies.append((time.perf_counter() - start) * 1000)
+        hits += len(gt & set(res["ids"][0]))
+    # 批量查询 (仅统计总耗时)
+    start = time.perf_counter()
+    store.query(query_embeddings=queries.tolist(), n_results=k)
+    batch_ms = (time.perf_counter() - start) * 1000
+
+    lat = np.array(latencies)
+    print(f"{name:<18} recall@{k}={hits / (len(queries) * k):.4f}  "
+          f"p50={np.percentile(lat, 50):.2f}ms  p95={np.percentile(lat, 95):.2f}ms  "
+          f"batch({len(queries)})={batch_ms:.1f}ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Chroma vs NumPy 向量镜像基准测试")
+    parser.add_argument("--synthetic", type=int, default=0, help="生成指定数量的随机向量代替现有知识库")
+    parser.add_argument("--dim", type=int, default=1024, help="随机向量维度 (bge-m3 为 1024)")
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--top-k", type=int, default=settings.DEFAULT_TOP_K)
+    parser.add_argument("--nlist", type=int, default=64, help="IVF 聚类数")
+    parser.add_argument("--nprobe", type=int, default=settings.VECTOR_INDEX_NPROBE)
+    args = parser.parse_args()
+
+    collection = load_collection(args)
+    metric = (collection.metadata or {}).get("hnsw:space", "l2")
+    data = collection.get(include=["embeddings"])
+    ids = data["ids"]
+    vecs = np.asarray(data["embeddings"], dtype=np.float32)
+    if not ids:
+        print("⚠️ 知识库为空，请先上传文档或使用 --synthetic")
+        return
+    print(f"📊 向量数={len(ids)}  维度={vecs.shape[1]}  度量={metric}  查询数={args.queries}")
+
+    # 用库内向量加噪声作为查询，真值取 float32 暴力检索结果
+    rng = np.random.default_rng(42)
+    picks = rng.choice(len(ids), min(args.queries, len(ids)), replace=False)
+    queries = vecs[picks] + 0.05 * rng.standard_normal((len(picks), vecs.shape[1])).astype(np.float32)
+    k = min(args.top_k, len(ids))
+    truth = exact_ground_truth(ids, vecs, queries, metric, k)
+
+    run("chroma (hnsw)", collection, queries, truth, k)
+    for dtype in NumpyVectorIndex.SUPPORTED_DTYPES:
+        for nlist in (0, args.nlist):
+            with tempfile.TemporaryDirectory() as tmp_dir:
+                index = NumpyVectorIndex(tmp_dir, dtype=dtype, metric=metric, nlist=nlist, nprobe=args.nprobe)
+                index.sync_from(collection)
+                # 数据量不足 nlist * IVF_MIN_POINTS_PER_LIST 时索引会回退到精确检索
+                if nlist and index.centroids is None:
+                    print(f"{'numpy ' + dtype:<18} ivf{nlist} 跳过: 向量数不足，已回退精确检索")
+                    continue
+                label = f"numpy {dtype}" + (f" ivf{nlist}" if index.centroids is not None else "")
+                run(label, index, queries, truth, k)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,47 @@
+# tests/test_bm25.py
+import pickle
+import pytest
+
+pytest.importorskip("jieba")
+pytest.importorskip("rank_bm25")
+
+import jieba
+from app.config import settings
+from app.utils.bm25 import BM25Retriever
+
+
+@pytest.fixture
+def bm25_path(tmp_path, monkeypatch):
+    path = tmp_path / "bm25.pkl"
+    monkeypatch.setattr(settings, "BM25_PATH", str(path))
+    return path
+
+
+def test_legacy_index_is_retokenized(bm25_path):
+    docs = ["伺服电机过载报警 E-1023", "注塑机模具温度设定"]
+    # 旧版索引：直接用 jieba.cut_for_search，没有 tokenizer_version
+    with open(bm25_path, "wb") as f:
+        pickle.dump({
+            "documents": docs,
+            "metadatas": [{"source": "a.pdf", "page": 1}, {"source": "b.pdf", "page": 2}],
+            "tokenized_corpus": [list(jieba.cut_for_search(d)) for d in docs]
+        }, f)
+
+    retriever = BM25Retriever()
+    assert retriever.tokenized_corpus == retriever.tokenizer.tokenize_batch(docs)
+
+    with open(bm25_path, "rb") as f:
+        saved = pickle.load(f)
+    assert saved["tokenizer_version"] == retriever.tokenizer.version
+    assert saved["tokenized_corpus"] == retriever.tokenized_corpus
+
+
+def test_search_by_partial_code(bm25_path):
+    retriever = BM25Retriever()
+    retriever.add_documents(
+        ["伺服电机过载报警 E-1023", "注塑机模具温度设定", "液压系统压力不足"],
+        [{"source": "a.pdf", "page": i} for i in range(3)]
+    )
+    docs, metas = retriever.search("1023", top_k=1)
+    assert docs == ["伺服电机过载报警 E-1023"]
+    assert metas == [{"source": "a.pdf", "page": 0}]
@@ -0,0 +1,88 @@
+# tests/test_tokenizer.py
+import multiprocessing
+import pytest
+
+pytest.importorskip("jieba")
+
+from app.config import settings
+from app.utils.tokenizer import ChineseTokenizer
+
+
+@pytest.fixture(scope="module")
+def tokenizer():
+    return ChineseTokenizer(user_dict_path=settings.TOKENIZER_USER_DICT)
+
+
+def test_code_kept_whole_with_parts(tokenizer):
+    tokens = tokenizer.tokenize("注塑机出现报警E-1023，请更换6ES7-315-2AG10模块")
+    assert "e-1023" in tokens
+    assert {"e", "1023", "e1023"} <= set(tokens)
+    assert "6es7-315-2ag10" in tokens
+    assert {"6es7", "315", "2ag10"} <= set(tokens)
+
+
+def test_partial_code_query_matches_document(tokenizer):
+    doc_tokens = set(tokenizer.tokenize("报警代码 E-1023 表示伺服过载"))
+    for query in ("1023", "E1023", "e-1023"):
+        assert set(tokenizer.tokenize_query(query)) & doc_tokens
+
+
+def test_numeric_values_not_treated_as_codes(tokenizer):
+    tokens = tokenizer.tokenize("2024-01-15 10:30 温度 3.5 度")
+    assert "2024-01-15" not in tokens
+    assert "10:30" not in tokens
+
+
+@pytest.mark.parametrize("text, glued", [
+    ("3.5mm", "35mm"),
+    ("X10.5", "x105"),
+    ("M8x1.25", "m8x125"),
+    ("G01 Y-3.2", "y32"),
+])
+def test_decimals_not_split_and_glued(tokenizer, text, glued):
+    tokens = tokenizer.tokenize(text)
+    assert glued not in tokens
+    assert not {"5mm", "25"} & set(tokens)
+
+
+def test_decimal_dimension_queries(tokenizer):
+    doc_tokens = set(tokenizer.tokenize("孔径 3.5mm，螺纹 M8x1.25，坐标 X10.5"))
+    assert {"3.5", "m8x1.25", "x10.5"} <= doc_tokens
+    assert "35mm" not in doc_tokens
+
+
+def test_domain_dictionary_loaded(tokenizer):
+    assert "伺服驱动器" in tokenizer.tokenize("检查伺服驱动器")
+
+
+def test_punctuation_dropped(tokenizer):
+    tokens = tokenizer.tokenize("急停！ 回零，。")
+    assert all(t.strip("！，。 ") for t in tokens)
+
+
+def test_index_and_query_tokenization_identical(tokenizer):
+    texts = ["注塑机合模时报警 AL-205，检查液压系统", "SDN是什么？", "Spindle alarm ALM.1001 on 主轴"]
+    assert tokenizer.tokenize_batch(texts) == [tokenizer.tokenize_query(t) for t in texts]
+    # 命中缓存后结果不变
+    assert tokenizer.tokenize_batch(texts) == [tokenizer.tokenize_query(t) for t in texts]
+
+
+def test_version_tracks_user_dict(tmp_path):
+    user_dict = tmp_path / "dict.txt"
+    user_dict.write_text("伺服电机 1000 n\n", encoding="utf-8")
+    v1 = ChineseTokenizer(user_dict_path=str(user_dict)).version
+    user_dict.write_text("伺服电机 1000 n\n变频器 1000 n\n", encoding="utf-8")
+    v2 = ChineseTokenizer(user_dict_path=str(user_dict)).version
+    assert v1 != v2
+
+
+@pytest.mark.skipif("fork" not in multiprocessing.get_all_start_methods(), reason="并行分词依赖 fork")
+def test_parallel_batch_matches_serial(tokenizer):
+    texts = [f"注塑机报警 E-{1000 + i}，检查伺服电机 3.5mm 顶针" for i in range(20)]
+    parallel = ChineseTokenizer(user_dict_path=settings.TOKENIZER_USER_DICT, workers=2, parallel_min_docs=1)
+    try:
+        assert parallel.tokenize_batch(texts) == [tokenizer.tokenize(t) for t in texts]
+        assert parallel._pool is not None
+    finally:
+        if parallel._pool is not None:
+            parallel._pool.shutdown()
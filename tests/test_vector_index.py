@@ -0,0 +1,209 @@
+# tests/test_vector_index.py
+import pytest
+
+np = pytest.importorskip("numpy")
+
+from app.utils.vector_index import NumpyVectorIndex
+
+
+class FakeCollection:
+    """只实现 sync_from 用到的 count / get"""
+
+    def __init__(self, ids, embeddings):
+        self.ids = list(ids)
+        self.embeddings = np.asarray(embeddings)
+
+    def count(self):
+        return len(self.ids)
+
+    def get(self, include, limit, offset):
+        ids = self.ids[offset:offset + limit]
+        return {
+            "ids": ids,
+            "embeddings": self.embeddings[offset:offset + limit],
+            "documents": ids,
+            "metadatas": [{"source": id_, "page": 0} for id_ in ids]
+        }
+
+
+def make_vectors(n, dim=32, seed=0):
+    rng = np.random.default_rng(seed)
+    return rng.standard_normal((n, dim)).astype(np.float32)
+
+
+def add(index, ids, vecs):
+    index.upsert(ids, vecs, ids, [{"source": id_, "page": 0} for id_ in ids])
+
+
+def brute_force_l2(vecs, queries, k):
+    d = ((queries[:, None, :] - vecs[None, :, :]) ** 2).sum(-1)
+    return np.argsort(d, axis=1)[:, :k]
+
+
+@pytest.mark.parametrize("dtype", NumpyVectorIndex.SUPPORTED_DTYPES)
+def test_exact_search_matches_brute_force(tmp_path, dtype):
+    vecs = make_vectors(500)
+    ids = [f"doc_{i}" for i in range(500)]
+    index = NumpyVectorIndex(str(tmp_path), dtype=dtype, block_size=128)
+    add(index, ids, vecs)
+
+    queries = vecs[:20] + 0.01
+    res = index.query(queries, n_results=5)
+    truth = brute_force_l2(vecs, queries, 5)
+    hits = sum(len(set(res["ids"][i]) & {ids[j] for j in truth[i]}) for i in range(20))
+    assert hits / 100 >= 0.95
+    assert res["documents"][0][0] == res["ids"][0][0]
+
+
+def test_reload_replays_appends_and_overwrites(tmp_path):
+    vecs = make_vectors(300)
+    ids = [f"doc_{i}" for i in range(300)]
+    index = NumpyVectorIndex(str(tmp_path))
+    add(index, ids[:200], vecs[:200])
+    add(index, ids[200:], vecs[200:])
+    # 覆盖已存在的 id
+    index.upsert(["doc_0"], vecs[299:300], ["updated"], [{"source": "new", "page": 1}])
+
+    reloaded = NumpyVectorIndex(str(tmp_path))
+    assert len(reloaded) == 300
+    assert reloaded.documents[0] == "updated"
+    res = reloaded.query(vecs[150:151], n_results=1)
+    assert res["ids"] == [["doc_150"]]
+
+
+@pytest.mark.parametrize("dtype", NumpyVectorIndex.SUPPORTED_DTYPES)
+def test_resident_copy_matches_after_reload(tmp_path, dtype):
+    vecs = make_vectors(1500)
+    ids = [f"doc_{i}" for i in range(1500)]
+    index = NumpyVectorIndex(str(tmp_path), dtype=dtype)
+    add(index, ids[:1000], vecs[:1000])
+    # 跨过初始容量，触发常驻副本扩容
+    add(index, ids[1000:], vecs[1000:])
+
+    reloaded = NumpyVectorIndex(str(tmp_path), dtype=dtype)
+    assert np.array_equal(reloaded._vectors[:1500], index._vectors[:1500])
+
+
+def test_nlist_change_rebuilds_and_new_rows_are_searchable(tmp_path):
+    vecs = make_vectors(1005)
+    ids = [f"doc_{i}" for i in range(1005)]
+    collection = FakeCollection(ids[:1000], vecs[:1000])
+    index = NumpyVectorIndex(str(tmp_path), nlist=8)
+    index.sync_from(collection)
+    assert index.centroids is not None
+
+    # 关闭 IVF 后重启：镜像必须从 Chroma 重建，不能沿用旧聚类
+    restarted = NumpyVectorIndex(str(tmp_path), nlist=0)
+    assert len(restarted) == 0
+    restarted.sync_from(collection)
+    assert restarted.centroids is None and restarted.assignments is None
+
+    add(restarted, ids[1000:], vecs[1000:])
+    res = restarted.query(vecs[1000:], n_results=1)
+    assert res["ids"] == [[id_] for id_ in ids[1000:]]
+
+    # 修改 nlist 同样触发重建
+    resized = NumpyVectorIndex(str(tmp_path), nlist=16)
+    assert len(resized) == 0
+    resized.sync_from(FakeCollection(ids, vecs))
+    assert len(resized.centroids) == 16
+    assert len(resized.assignments) == 1005
+
+
+def test_ivf_retrains_as_corpus_grows(tmp_path):
+    vecs = make_vectors(200)
+    ids = [f"doc_{i}" for i in range(200)]
+    index = NumpyVectorIndex(str(tmp_path), nlist=4, nprobe=4)
+    add(index, ids[:40], vecs[:40])
+    assert index.ivf_trained_size == 40
+
+    add(index, ids[40:60], vecs[40:60])
+    assert index.ivf_trained_size == 40
+    assert len(index.assignments) == 60
+
+    add(index, ids[60:], vecs[60:])
+    assert index.ivf_trained_size == 200
+
+    reloaded = NumpyVectorIndex(str(tmp_path), nlist=4, nprobe=4)
+    assert np.array_equal(reloaded.assignments, index.assignments)
+    # nprobe 覆盖全部聚类时 IVF 等价于精确检索
+    res = reloaded.query(vecs[:10], n_results=1)
+    assert res["ids"] == [[id_] for id_ in ids[:10]]
+
+
+def test_batched_ivf_matches_single_queries(tmp_path):
+    vecs = make_vectors(800)
+    ids = [f"doc_{i}" for i in range(800)]
+    index = NumpyVectorIndex(str(tmp_path), nlist=16, nprobe=3, block_size=100)
+    add(index, ids, vecs)
+
+    queries = make_vectors(12, seed=1)
+    batched = index.query(queries, n_results=5)
+    for i, q in enumerate(queries):
+        single = index.query(q, n_results=5)
+        assert single["ids"][0] == batched["ids"][i]
+
+
+def test_invalidate_forces_rebuild_after_in_place_update(tmp_path):
+    vecs = make_vectors(50)
+    ids = [f"doc_{i}" for i in range(50)]
+    index = NumpyVectorIndex(str(tmp_path))
+    index.sync_from(FakeCollection(ids, vecs))
+
+    # 镜像关闭期间 Chroma 原地更新了同一批 id，条数不变
+    updated = make_vectors(50, seed=7)
+    NumpyVectorIndex.invalidate(str(tmp_path))
+
+    restarted = NumpyVectorIndex(str(tmp_path))
+    restarted.sync_from(FakeCollection(ids, updated))
+    res = restarted.query(updated[:5], n_results=1)
+    assert res["ids"] == [[id_] for id_ in ids[:5]]
+
+
+def test_crash_during_overwrite_forces_rebuild(tmp_path, monkeypatch):
+    vecs = make_vectors(100)
+    ids = [f"doc_{i}" for i in range(100)]
+    index = NumpyVectorIndex(str(tmp_path))
+    index.sync_from(FakeCollection(ids, vecs))
+
+    # 向量已覆盖写入，日志/元数据还没写就崩溃
+    def crash(pos):
+        raise RuntimeError("simulated crash")
+    monkeypatch.setattr(index, "_append_log", crash)
+    updated = make_vectors(1, seed=3)
+    with pytest.raises(RuntimeError):
+        index.upsert(["doc_0"], updated, ["new text"], [{"source": "new", "page": 0}])
+
+    restarted = NumpyVectorIndex(str(tmp_path))
+    assert len(restarted) == 0
+    chroma_vecs = vecs.copy()
+    chroma_vecs[0] = updated[0]
+    restarted.sync_from(FakeCollection(ids, chroma_vecs))
+    assert restarted.query(updated, n_results=1)["ids"] == [["doc_0"]]
+
+
+def test_rebuild_replaces_stale_contents(tmp_path):
+    vecs = make_vectors(60)
+    ids = [f"doc_{i}" for i in range(60)]
+    index = NumpyVectorIndex(str(tmp_path))
+    index.sync_from(FakeCollection(ids, vecs))
+
+    updated = make_vectors(60, seed=5)
+    index.rebuild(FakeCollection(ids, updated))
+    assert index.query(updated[:3], n_results=1)["ids"] == [[id_] for id_ in ids[:3]]
+    assert NumpyVectorIndex(str(tmp_path)).query(updated[:3], n_results=1)["ids"] == [[id_] for id_ in ids[:3]]
+
+
+def test_ivf_ip_probes_by_inner_product(tmp_path):
+    rng = np.random.default_rng(0)
+    # 小范数簇离查询更近 (L2)，大范数簇的内积更大：ip 度量下应探查后者
+    near = np.array([1.0, 0.0]) + 0.01 * rng.standard_normal((30, 2))
+    far = np.array([10.0, 0.0]) + 0.01 * rng.standard_normal((30, 2))
+    vecs = np.vstack([near, far]).astype(np.float32)
+    ids = [f"near_{i}" for i in range(30)] + [f"far_{i}" for i in range(30)]
+    index = NumpyVectorIndex(str(tmp_path), metric="ip", nlist=2, nprobe=1)
+    add(index, ids, vecs)
+    assert index.centroids is not None
+
+    res = index.query([[1.0, 0.0]], n_results=5)
+    assert all(id_.startswith("far_") for id_ in res["ids"][0])